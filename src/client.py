@@ -1,18 +1,24 @@
 import asyncio
 import logging
 import types
+from collections.abc import AsyncIterator, Iterable
 from datetime import date, datetime
+from typing import Any
 
 from aiohttp import (
     ClientSession,
+    TCPConnector,
     TraceConfig,
     TraceRequestEndParams,
     TraceRequestStartParams,
 )
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
 
 from src.settings import Settings
 
+PRESIDENT_ROLE = 10
+TREASURER_ROLE = 7
+
 
 class UserSchema(BaseModel):
     id: int
@@ -39,6 +45,38 @@ class ClubSchema(BaseModel):
     members: list[MembershipSchema]
 
 
+class ClubInfoSchema(BaseModel):
+    """Projection of `ClubSchema`, which keeps only the board of the club.
+
+    Clubs can have hundreds of current and former members,
+    but most of the features of the bot only need the president
+    and the treasurer.
+    Memberships that don't belong to the board are dropped
+    before being validated, which makes parsing much cheaper.
+    """
+
+    model_config = ConfigDict(validate_by_name=True)
+
+    id: int
+    name: str
+    logo: str | None
+    is_active: bool
+    short_description: str
+    address: str
+    board: list[MembershipSchema] = Field(validation_alias="members")
+
+    @field_validator("board", mode="before")
+    @classmethod
+    def keep_board_only(cls, value: Any) -> Any:
+        if not isinstance(value, list):
+            # let pydantic report the error
+            return value
+        board_roles = {PRESIDENT_ROLE, TREASURER_ROLE}
+        return [
+            m for m in value if not isinstance(m, dict) or m.get("role") in board_roles
+        ]
+
+
 class SimpleClubSchema(BaseModel):
     id: int
     name: str
@@ -82,14 +120,28 @@ class SithClient(ClientSession):
         trace_config = TraceConfig()
         trace_config.on_request_start.append(request_logging_start)
         trace_config.on_request_end.append(request_logging_end)
+        # All requests go to the same host, so connections to it are kept
+        # alive longer than by default, and its address is cached.
+        # The limits of the pool are the ones of aiohttp.
+        # Compressed responses (gzip, and brotli when installed)
+        # are negotiated and decoded automatically by aiohttp.
+        connector = TCPConnector(
+            keepalive_timeout=config.keepalive_timeout,
+            ttl_dns_cache=config.dns_cache_ttl,
+        )
         super().__init__(
             base_url=str(config.url),
             headers={"X-APIKey": config.api_key.get_secret_value()},
+            connector=connector,
             trace_configs=[trace_config],
         )
 
     async def get_club(self, club_id: int) -> ClubSchema | None:
-        """Fetch the information about the club from the sith API."""
+        """Fetch the information about the club from the sith API.
+
+        This returns the club with its whole member list.
+        If only the board is needed, use `get_club_infos` instead.
+        """
         async with self.get(f"/api/club/{club_id}") as res:
             content = await res.read()
         try:
@@ -97,6 +149,70 @@ class SithClient(ClientSession):
         except ValidationError as e:
             self.logger.error(str(e))
 
+    async def get_club_infos(self, club_id: int) -> ClubInfoSchema | None:
+        """Fetch the information about the club and its board from the sith API."""
+        async with self.get(f"/api/club/{club_id}") as res:
+            content = await res.read()
+        try:
+            return ClubInfoSchema.model_validate_json(content)
+        except ValidationError as e:
+            self.logger.error(str(e))
+
+    async def get_clubs(
+        self, club_ids: Iterable[int], *, concurrency: int = 8, full: bool = False
+    ) -> AsyncIterator[tuple[int, ClubInfoSchema | ClubSchema | None]]:
+        """Fetch multiple clubs from the sith API concurrently.
+
+        Results are yielded as soon as they are available,
+        thus not necessarily in the order of `club_ids`.
+        If a club cannot be fetched, `None` is yielded for it
+        and the other clubs are fetched as usual.
+
+        Args:
+            club_ids: the ids of the clubs to fetch
+            concurrency: the maximum number of simultaneous requests
+            full: if True, fetch the clubs with their whole member list
+                (like `get_club`), else only with their board
+                (like `get_club_infos`)
+
+        Examples:
+            ```python
+            async for club_id, club in client.get_clubs([1, 2, 3]):
+                ...
+            ```
+        """
+        fetch = self.get_club if full else self.get_club_infos
+        ids = iter(club_ids)
+        results = asyncio.Queue()
+        finished = object()
+
+        async def worker():
+            try:
+                # all workers share the same iterator,
+                # so each id is fetched exactly once
+                for club_id in ids:
+                    try:
+                        club = await fetch(club_id)
+                    except Exception:
+                        self.logger.exception(f"Could not fetch club {club_id}")
+                        club = None
+                    results.put_nowait((club_id, club))
+            finally:
+                results.put_nowait(finished)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            remaining = len(workers)
+            while remaining:
+                item = await results.get()
+                if item is finished:
+                    remaining -= 1
+                    continue
+                yield item
+        finally:
+            for task in workers:
+                task.cancel()
+
     async def search_clubs(self, search: str) -> list[SimpleClubSchema] | None:
         """Given a string, get the result of the autocompletion route of the API."""
         if len(search) < 1:
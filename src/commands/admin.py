@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import io
+from typing import TYPE_CHECKING, Literal
 
+from discord import File
 from discord.ext import commands
 
+from src.services.profiler import SamplingProfiler
+
 if TYPE_CHECKING:
-    from discord.app_commands import AppCommand
     from discord.ext.commands import Context
 
     from src.main import AeBot
@@ -16,10 +19,50 @@ class AdminCog(commands.Cog):
         self._bot = bot
 
     @commands.command(name="sync")
-    async def sync_commands(self, ctx: Context):
-        """Actualise les commandes du bot."""
-        synced: list[AppCommand] = await self._bot.tree.sync()
-        await self._bot.tree.sync(guild=ctx.guild)
+    async def sync_commands(self, ctx: Context, mode: Literal["force"] | None = None):
+        """Actualise les commandes du bot.
+
+        Les commandes ne sont synchronisées que si elles ont changé
+        depuis la dernière synchronisation.
+        Utilisez `sync force` pour forcer la synchronisation.
+        """
+        force = mode == "force"
+        synced_global = await self._bot.sync_tree(force=force)
+        synced_guild = await self._bot.sync_tree(ctx.guild, force=force)
+        if synced_global is None and synced_guild is None:
+            await ctx.reply("Les commandes sont déjà à jour.")
+            return
+        synced = (synced_global or []) + (synced_guild or [])
         cmd_list = "\n".join([f"- {cmd.name}" for cmd in synced])
         msg = f"Commandes synchronisées :\n{cmd_list}"
         await ctx.reply(msg)
+
+    @commands.command(name="profile")
+    @commands.has_permissions(administrator=True)
+    async def profile(self, ctx: Context, seconds: int = 30):
+        """Profile le bot pendant quelques secondes (5 minutes maximum)."""
+        seconds = min(max(seconds, 1), 300)
+        await ctx.reply(f"Profilage pendant {seconds} secondes...")
+        profiler = SamplingProfiler()
+        await profiler.run(seconds)
+        files = [
+            File(io.BytesIO(profiler.report().encode()), filename="profile.txt"),
+            File(
+                io.BytesIO(profiler.collapsed_stacks().encode()),
+                filename="profile.folded",
+            ),
+        ]
+        await ctx.reply("Profilage terminé.", files=files)
+
+    @commands.command(name="lag")
+    @commands.has_permissions(administrator=True)
+    async def loop_lag(self, ctx: Context):
+        """Affiche la latence de la boucle d'événements du bot."""
+        percentiles = self._bot.watchdog.percentiles()
+        if not percentiles:
+            await ctx.reply("Pas encore assez de mesures.")
+            return
+        lines = "\n".join(
+            f"- {name} : {value * 1000:.1f}ms" for name, value in percentiles.items()
+        )
+        await ctx.reply(f"Latence de la boucle d'événements :\n{lines}")
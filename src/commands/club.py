@@ -1,26 +1,39 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import asyncio
+import io
+import tempfile
+from typing import TYPE_CHECKING, Literal
 
-from discord import Interaction, Member, app_commands, utils
+from discord import File, Interaction, Member, app_commands, utils
 from discord.app_commands import Choice, Transform, Transformer
 from discord.ext import commands
 from discord.ext.commands import BadArgument
 
-from src.client import ClubSchema  # noqa TC001
+from src.client import ClubInfoSchema  # noqa TC001
 from src.db.models import Club
-from src.services.club import ClubService
+from src.services.club import CLUB_CACHE_TTL
 from src.settings import Settings
 
 if TYPE_CHECKING:
     from src.main import AeBot
 
+# Discord gives 3 seconds to answer an autocomplete interaction.
+# Keep a margin for the time spent in the network and in discord.py.
+AUTOCOMPLETE_TIMEOUT = 2.0
+
 
 class ClubTransformer(Transformer):
     async def transform(
         self, interaction: Interaction[AeBot], value: int
-    ) -> ClubSchema:
-        club = await interaction.client.client.get_club(value)
+    ) -> ClubInfoSchema:
+        try:
+            club_id = int(value)
+        except ValueError:
+            raise BadArgument("Ce club n'existe pas") from None
+        club = await interaction.client.club_service.get_club(
+            club_id, max_age=CLUB_CACHE_TTL
+        )
         if not club:
             raise BadArgument("Ce club n'existe pas")
         return club
@@ -28,25 +41,56 @@ class ClubTransformer(Transformer):
 
 class ClubCog(commands.GroupCog, group_name="club"):
     def __init__(self, bot: AeBot):
-        self.club_service = ClubService(bot)
+        self.club_service = bot.club_service
         self.settings = Settings()
         self.bot = bot
+        self._autocomplete_tasks: dict[int, asyncio.Task] = {}
 
-    async def autocomplete_club(
-        self, _interaction: Interaction, current: str
+    @commands.Cog.listener()
+    async def on_sith_club_update(self, club_id: int):
+        self.club_service.invalidate_club(club_id)
+
+    async def _autocomplete(
+        self, interaction: Interaction, current: str, *, only_existing: bool
     ) -> list[Choice]:
-        """Autocompletion for clubs."""
-        clubs = await self.club_service.search_club(current, only_existing=False)
+        """Search clubs for an autocomplete interaction.
+
+        Discord sends an autocomplete interaction on almost every keystroke.
+        When a user types again before the previous search is over,
+        the previous one is cancelled (no answer is sent for it,
+        discord would discard it anyway).
+        """
+        task = asyncio.current_task()
+        previous = self._autocomplete_tasks.get(interaction.user.id)
+        if previous is not None and not previous.done():
+            previous.cancel()
+        self._autocomplete_tasks[interaction.user.id] = task
+        try:
+            clubs = await self.club_service.search_club(
+                current, only_existing=only_existing, timeout=AUTOCOMPLETE_TIMEOUT
+            )
+        finally:
+            if self._autocomplete_tasks.get(interaction.user.id) is task:
+                del self._autocomplete_tasks[interaction.user.id]
         clubs = clubs[:25]  # discord autocomplete can have at most 25 items
+        # The user will likely pick one of the first suggestions
+        # (especially one that matches exactly what they typed),
+        # so fetch them now, to not make the command wait for it.
+        exact = [c.id for c in clubs if c.name.lower() == current.lower()]
+        self.club_service.prefetch_clubs([*exact, *(c.id for c in clubs[:3])])
         return [Choice(name=club.name, value=str(club.id)) for club in clubs]
 
+    async def autocomplete_club(
+        self, interaction: Interaction, current: str
+    ) -> list[Choice]:
+        """Autocompletion for clubs."""
+        return await self._autocomplete(interaction, current, only_existing=False)
+
     async def autocomplete_existing_club(
-        self, _interaction: Interaction, current: str
+        self, interaction: Interaction, current: str
     ) -> list[Choice]:
         """Autocompletion for clubs that have a channel in the guild"""
-        clubs = await self.club_service.search_club(current, only_existing=True)
-        clubs = clubs[:25]  # discord autocomplete can have at most 25 items
-        return [Choice(name=club.name, value=str(club.id)) for club in clubs]
+        return await self._autocomplete(interaction, current, only_existing=True)
 
     @app_commands.command(
         name="infos",
@@ -55,7 +99,7 @@ class ClubCog(commands.GroupCog, group_name="club"):
     @app_commands.autocomplete(club=autocomplete_club)
     @app_commands.describe(club="Le club dont on veut avoir les infos")
     async def club_infos(
-        self, interaction: Interaction, club: Transform[ClubSchema, ClubTransformer]
+        self, interaction: Interaction, club: Transform[ClubInfoSchema, ClubTransformer]
     ):
         await interaction.response.send_message(embed=self.club_service.embed(club))
 
@@ -70,7 +114,7 @@ class ClubCog(commands.GroupCog, group_name="club"):
     async def remove_club_member(
         self,
         interaction: Interaction,
-        club: Transform[ClubSchema, ClubTransformer],
+        club: Transform[ClubInfoSchema, ClubTransformer],
         member: Member,
     ):
         await interaction.response.defer(thinking=True, ephemeral=True)
@@ -113,7 +157,7 @@ class ClubCog(commands.GroupCog, group_name="club"):
     async def add_club_member(
         self,
         interaction: Interaction,
-        club: Transform[ClubSchema, ClubTransformer],
+        club: Transform[ClubInfoSchema, ClubTransformer],
         member: Member,
     ):
         await interaction.response.defer(thinking=True, ephemeral=True)
@@ -146,7 +190,7 @@ class ClubCog(commands.GroupCog, group_name="club"):
     @app_commands.checks.has_permissions(manage_guild=True)
     @app_commands.describe(club="le club à créer")
     async def create_club(
-        self, interaction: Interaction, club: Transform[ClubSchema, ClubTransformer]
+        self, interaction: Interaction, club: Transform[ClubInfoSchema, ClubTransformer]
     ):
         await interaction.response.defer(thinking=True, ephemeral=True)
         if Club.filter(Club.sith_id == club.id).exists():
@@ -181,7 +225,7 @@ class ClubCog(commands.GroupCog, group_name="club"):
     async def handover(
         self,
         interaction: Interaction,
-        club: Transform[ClubSchema, ClubTransformer],
+        club: Transform[ClubInfoSchema, ClubTransformer],
         new_president: Member,
         new_treasurer: Member,
     ):
@@ -220,7 +264,7 @@ class ClubCog(commands.GroupCog, group_name="club"):
     @app_commands.checks.has_permissions(manage_guild=True)
     @app_commands.describe(club="le club à désactiver")
     async def stop_club(
-        self, interaction: Interaction, club: Transform[ClubSchema, ClubTransformer]
+        self, interaction: Interaction, club: Transform[ClubInfoSchema, ClubTransformer]
     ):
         await interaction.response.defer(thinking=True, ephemeral=True)
         db_club = Club.get_or_none(Club.sith_id == club.id)
@@ -234,3 +278,24 @@ class ClubCog(commands.GroupCog, group_name="club"):
                 "temporairement fermé jusqu'à reprise du club"
             )
         await interaction.followup.send(f"Le club : {club.name} à été arrêté")
+
+    @app_commands.command(
+        name="export",
+        description="Exporte la liste des membres de tous les clubs.",
+    )
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @app_commands.rename(fmt="format")
+    @app_commands.describe(fmt="le format du fichier")
+    async def export_members(
+        self, interaction: Interaction, fmt: Literal["csv", "json"] = "csv"
+    ):
+        await interaction.response.defer(thinking=True, ephemeral=True)
+        with tempfile.TemporaryFile() as file:
+            out = io.TextIOWrapper(file, encoding="utf-8", newline="")
+            await self.club_service.export_memberships(interaction.guild, out, fmt=fmt)
+            out.flush()
+            out.detach()  # keep the file open once the wrapper is gone
+            file.seek(0)
+            await interaction.followup.send(
+                file=File(file, filename=f"membres_clubs.{fmt}")
+            )
@@ -1,49 +1,197 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import pytz
-from discord.ext import commands, tasks
+from discord.ext import commands
 
-from src.services.news import NewsService
+from src.client import NewsDateSchema
+from src.services.news import NewsService, pack_embeds
 
 if TYPE_CHECKING:
     from discord import Role, TextChannel
 
     from src.main import AeBot
 
+PARIS_TZ = pytz.timezone("Europe/Paris")
+POST_TIME = datetime.time(hour=9, minute=30)
+# The news are fetched a little bit before being posted,
+# so that a slow sith API doesn't delay the post.
+PREFETCH_TIME = datetime.time(hour=9, minute=15)
+REMINDER_DELAY = datetime.timedelta(hours=1)
+# If the bot was offline at the scheduled time,
+# a post more late than that is skipped.
+MAX_POST_DELAY = datetime.timedelta(minutes=10)
+# Number of seconds during which the notifications of news updates
+# are gathered, to handle them with a single request to the sith.
+NEWS_UPDATE_DELAY = 5
 
-class NewsCog(commands.Cog):
-    news_channel: TextChannel
-    news_role: Role
 
+def next_occurrence(time: datetime.time) -> datetime.datetime:
+    """Return the next moment when it will be the given time in Paris."""
+    now = datetime.datetime.now(tz=PARIS_TZ)
+    moment = PARIS_TZ.localize(datetime.datetime.combine(now.date(), time))
+    if moment <= now:
+        tomorrow = now.date() + datetime.timedelta(days=1)
+        moment = PARIS_TZ.localize(datetime.datetime.combine(tomorrow, time))
+    return moment
+
+
+def is_late(time: datetime.time) -> bool:
+    """Tell if the last occurrence of the given time in Paris is too long ago."""
+    now = datetime.datetime.now(tz=PARIS_TZ)
+    last = PARIS_TZ.localize(datetime.datetime.combine(now.date(), time))
+    if last > now:
+        yesterday = now.date() - datetime.timedelta(days=1)
+        last = PARIS_TZ.localize(datetime.datetime.combine(yesterday, time))
+    return now - last > MAX_POST_DELAY
+
+
+class NewsCog(commands.Cog):
     def __init__(self, bot: AeBot):
         self.bot = bot
         self.news_service = NewsService(bot)
+        self._digest: list[NewsDateSchema] | None = None
+        # news posted by the last digest, or announced since then
+        self._announced: set[int] = set()
+        # news updated on the sith, and not handled yet
+        self._updated_news: set[int] = set()
+        self._update_task: asyncio.Task | None = None
+        if bot.settings.guild.news_channel_id:
+            # If no news channel id is given in the config,
+            # the feature of automatic news post is disabled.
+            bot.scheduler.register("news_prefetch", self.prefetch_news)
+            bot.scheduler.register("news_post", self.post_news)
+            bot.scheduler.register("news_reminder", self.remind_news)
+
+    @property
+    def news_channel(self) -> TextChannel:
+        return self.bot.get_channel(self.bot.settings.guild.news_channel_id)
+
+    @property
+    def news_role(self) -> Role | None:
+        news_role_id = self.bot.settings.guild.news_role_id
+        return self.bot.watched_guild.get_role(news_role_id) if news_role_id else None
 
     @commands.Cog.listener(name="on_ready")
     async def on_ready(self):
-        news_channel_id = self.bot.settings.guild.news_channel_id
-        news_role_id = self.bot.settings.guild.news_role_id
-        if not news_channel_id:
-            # If no news channel id is given in the config,
-            # the feature of automatic news post is disabled.
+        if not self.bot.settings.guild.news_channel_id:
+            return
+        scheduler = self.bot.scheduler
+        if not scheduler.is_scheduled("news_prefetch"):
+            scheduler.schedule(
+                "news_prefetch", "news_prefetch", next_occurrence(PREFETCH_TIME)
+            )
+        if not scheduler.is_scheduled("news_post"):
+            scheduler.schedule("news_post", "news_post", next_occurrence(POST_TIME))
+
+    def schedule_reminders(self, news_dates: list[NewsDateSchema]):
+        """Schedule a reminder a little bit before each of those events."""
+        now = datetime.datetime.now(tz=datetime.UTC)
+        for news_date in news_dates:
+            when = news_date.start_date - REMINDER_DELAY
+            if when <= now:
+                continue
+            self.bot.scheduler.schedule(
+                f"news_reminder:{news_date.id}",
+                "news_reminder",
+                when,
+                {"news_date": news_date.model_dump(mode="json")},
+            )
+
+    async def prefetch_news(self, _payload: dict[str, Any]):
+        """Fetch and render the news that will be posted with the next digest."""
+        self.bot.scheduler.schedule(
+            "news_prefetch", "news_prefetch", next_occurrence(PREFETCH_TIME)
+        )
+        if is_late(PREFETCH_TIME):
+            # The bot was offline at that time, the digest will be fetched later
             return
-        self.news_channel = self.bot.get_channel(news_channel_id)
-        self.news_role = self.bot.watched_guild.get_role(news_role_id)
-        await self.bot.wait_until_ready()
-        self.post_news.start()
-
-    @tasks.loop(
-        time=datetime.time(hour=9, minute=30, tzinfo=pytz.timezone("Europe/Paris"))
-    )
-    async def post_news(self):
         news_dates = await self.news_service.get_upcoming_news()
-        if not news_dates:
+        for news_date in news_dates:
+            # render the embeds now, they will be taken from the cache
+            self.news_service.embed(news_date.news)
+        self._digest = news_dates
+        self.schedule_reminders(news_dates)
+
+    async def post_news(self, _payload: dict[str, Any]):
+        self.bot.scheduler.schedule(
+            "news_post", "news_post", next_occurrence(POST_TIME)
+        )
+        if is_late(POST_TIME):
+            # The bot was offline at that time, wait for the next digest
             return
+        news_dates, self._digest = self._digest, None
+        if news_dates is None:
+            # The prefetch failed, or the bot restarted since then
+            news_dates = await self.news_service.get_upcoming_news()
+            self.schedule_reminders(news_dates)
+        self._announced = {n.news.id for n in news_dates}
         embeds = [self.news_service.embed(n.news) for n in news_dates]
+        if not embeds:
+            return
         content = "## Événements dans les prochains jours"
         if self.news_role:
             content += f"\n{self.news_role.mention}"
-        await self.news_channel.send(content, embeds=embeds)
+        for i, message_embeds in enumerate(pack_embeds(embeds)):
+            await self.news_channel.send(
+                content if i == 0 else None, embeds=message_embeds
+            )
+
+    @commands.Cog.listener()
+    async def on_sith_news_update(self, news_id: int):
+        if not self.bot.settings.guild.news_channel_id:
+            return
+        self._updated_news.add(news_id)
+        if self._update_task is None:
+            self._update_task = asyncio.create_task(self._process_news_updates())
+
+    async def _process_news_updates(self):
+        """Handle the news updated since the last call, with a single request.
+
+        A new news whose event starts before the next digest is posted
+        right away. News that were already posted are left alone,
+        so that editing them doesn't post them again, and so are news
+        whose event starts after the next digest, because the digest
+        will post them.
+        """
+        # wait for the other notifications of a burst of edits
+        await asyncio.sleep(NEWS_UPDATE_DELAY)
+        updated, self._updated_news = self._updated_news, set()
+        self._update_task = None
+        try:
+            news_dates = await self.news_service.get_upcoming_news()
+            self.schedule_reminders(news_dates)
+            if self._digest is not None:
+                digest_ids = {n.news.id for n in self._digest}
+                if updated & (digest_ids | {n.news.id for n in news_dates}):
+                    # the prefetched digest is outdated
+                    self._digest = news_dates
+            next_digest = next_occurrence(POST_TIME)
+            new_news = {
+                n.news.id: n.news
+                for n in news_dates
+                if n.news.id in updated
+                and n.news.id not in self._announced
+                and n.start_date < next_digest
+            }
+            for news in new_news.values():
+                self._announced.add(news.id)
+                await self.news_channel.send(
+                    "## Nouvel événement", embed=self.news_service.embed(news)
+                )
+        except Exception:
+            self.bot.logger.exception(f"Could not handle the updates of news {updated}")
+
+    async def remind_news(self, payload: dict[str, Any]):
+        news_date = NewsDateSchema.model_validate(payload["news_date"])
+        if news_date.start_date <= datetime.datetime.now(tz=datetime.UTC):
+            # The bot was offline at that time, and the event already started
+            return
+        start = int(news_date.start_date.timestamp())
+        await self.news_channel.send(
+            f"⏰ **{news_date.news.title}** commence <t:{start}:R>",
+            embed=self.news_service.embed(news_date.news),
+        )
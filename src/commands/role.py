@@ -1,16 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 from typing import TYPE_CHECKING
 
 from discord.ext import commands
 
 from src.client import ClubSchema  # noqa TC001
 from src.db.models import Club
-from src.services.club import ClubService
 from src.settings import Settings
 
 if TYPE_CHECKING:
-    from discord import RawReactionActionEvent
+    from discord import Member, RawReactionActionEvent
 
     from src.main import AeBot
 
@@ -18,8 +18,46 @@ if TYPE_CHECKING:
 class RoleCog(commands.GroupCog, group_name="role"):
     def __init__(self, bot: AeBot):
         self.settings = Settings()
-        self.club_service = ClubService(bot)
+        self.club_service = bot.club_service
         self.bot = bot
+        # for each member, the clubs they joined or left and are
+        # still waiting to be processed, in the order of the reactions
+        self._pending: dict[int, dict[int, tuple[Club, bool]]] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+
+    def _enqueue(self, member: Member, club: Club, *, joined: bool):
+        """Register a membership change and make sure it will be processed.
+
+        Changes of a same member are applied one at a time, in order.
+        If the member toggles their reaction multiple times before
+        the previous change is applied, only the last state is kept.
+        """
+        pending = self._pending.setdefault(member.id, {})
+        pending.pop(club.id, None)  # move the club at the end of the queue
+        pending[club.id] = (club, joined)
+        if member.id not in self._workers:
+            self._workers[member.id] = asyncio.create_task(self._process(member))
+
+    async def _process(self, member: Member):
+        try:
+            while pending := self._pending.get(member.id):
+                club_id = next(iter(pending))
+                club, joined = pending.pop(club_id)
+                try:
+                    if joined:
+                        await self.club_service.add_member(club, member)
+                    else:
+                        await self.club_service.remove_member(
+                            club, member, make_former=False
+                        )
+                except Exception:
+                    self.bot.logger.exception(
+                        f"Could not update the roles of {member.name} "
+                        f"for the club {club.name}"
+                    )
+        finally:
+            self._pending.pop(member.id, None)
+            del self._workers[member.id]
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: RawReactionActionEvent):
@@ -31,12 +69,12 @@ class RoleCog(commands.GroupCog, group_name="role"):
         if not db_club:
             return
 
-        channel = self.bot.get_channel(payload.channel_id)
-        message = await channel.fetch_message(payload.message_id)
         if str(payload.emoji) != "✅":
+            channel = self.bot.get_channel(payload.channel_id)
+            message = channel.get_partial_message(payload.message_id)
             await message.remove_reaction(payload.emoji, member)
 
-        await self.club_service.add_member(db_club, member)
+        self._enqueue(member, db_club, joined=True)
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload: RawReactionActionEvent):
@@ -48,4 +86,4 @@ class RoleCog(commands.GroupCog, group_name="role"):
         if not db_club or str(payload.emoji) != "✅":
             return
 
-        await self.club_service.remove_member(db_club, member, make_former=False)
+        self._enqueue(member, db_club, joined=False)
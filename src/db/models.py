@@ -39,5 +39,17 @@ class Club(DbBaseModel):
     message_autorole_id = peewee.IntegerField(unique=True)
 
 
+class Timer(DbBaseModel):
+    key = peewee.CharField(unique=True)
+    kind = peewee.CharField()
+    due_at = peewee.FloatField(index=True)  # UNIX timestamp
+    payload = peewee.TextField(default="{}")  # JSON data given to the handler
+
+
+class CommandTreeHash(DbBaseModel):
+    scope = peewee.CharField(unique=True)  # "global" or the id of a guild
+    hash = peewee.CharField()
+
+
 def init():
-    db.create_tables([User, Club])
+    db.create_tables([User, Club, Timer, CommandTreeHash])
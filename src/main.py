@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import json
 import logging
+import signal
 from datetime import datetime
 from logging import handlers
 from typing import TYPE_CHECKING
 
-from discord import Game, Guild, Intents, Interaction
+from discord import Game, Guild, Intents, Interaction, Object
 from discord.ext import commands
 from discord.utils import setup_logging
 
@@ -16,34 +19,127 @@ from src.commands.club import ClubCog
 from src.commands.misc import MiscCog
 from src.commands.news import NewsCog
 from src.commands.role import RoleCog
+from src.db import models
+from src.db.models import CommandTreeHash
+from src.services.club import ClubService
+from src.services.recorder import GatewayRecorder, recording_path
+from src.services.scheduler import Scheduler
+from src.services.snapshot import SnapshotService
+from src.services.watchdog import LoopWatchdog
+from src.services.webhook import WebhookServer
 from src.settings import BASE_DIR, Settings
 
 if TYPE_CHECKING:
-    from discord.app_commands import Command
+    from discord.abc import Snowflake
+    from discord.app_commands import AppCommand, Command
     from discord.ext.commands import Context
 
 
 class AeBot(commands.Bot):
     watched_guild: Guild
 
-    def __init__(self, client: SithClient):
+    def __init__(self, client: SithClient, **options):
         self.settings = Settings()
         self.logger = logging.getLogger("discord")
         self.client = client
+        self.club_service = ClubService(self)
+        self.snapshot = SnapshotService(self)
+        self.scheduler = Scheduler()
+        self.watchdog = LoopWatchdog(threshold=self.settings.bot.loop_lag_threshold)
+        self.webhook = (
+            WebhookServer(self, self.settings.webhook)
+            if self.settings.webhook
+            else None
+        )
+        self.recorder = (
+            GatewayRecorder(recording_path(BASE_DIR / "data"))
+            if self.settings.bot.record_gateway_events
+            else None
+        )
         super().__init__(
-            command_prefix=self.settings.bot.command_prefix, intents=Intents.all()
+            command_prefix=self.settings.bot.command_prefix,
+            intents=Intents.all(),
+            enable_debug_events=self.recorder is not None,
+            **options,
         )
 
     async def setup_hook(self):
+        self.watchdog.start()
+        if self.recorder:
+            self.recorder.start()
+        if self.snapshot.load():
+            # serve from the snapshot right away, and refresh it once ready
+            self._refresh_task = asyncio.create_task(self._refresh_caches())
+        self.snapshot.periodic_save.start()
+        await self.add_cogs()
+        if self.webhook:
+            await self.webhook.start()
+        if self.settings.bot.sync_commands_on_startup:
+            await self.sync_tree()
+            await self.sync_tree(Object(id=self.settings.guild.id))
+
+    async def add_cogs(self):
         await self.add_cog(ClubCog(self))
         await self.add_cog(NewsCog(self))
         await self.add_cog(AdminCog(self))
         await self.add_cog(MiscCog())
         await self.add_cog(RoleCog(self))
 
+    def command_tree_hash(self, guild: Snowflake | None = None) -> str:
+        """Return a hash of the app commands registered for this scope."""
+        commands = sorted(self.tree.get_commands(guild=guild), key=lambda c: c.name)
+        payload = json.dumps([c.to_dict(self.tree) for c in commands], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def sync_tree(
+        self, guild: Snowflake | None = None, *, force: bool = False
+    ) -> list[AppCommand] | None:
+        """Sync the app commands of this scope with discord.
+
+        Syncing is heavily rate-limited by discord,
+        so it is skipped if the commands didn't change since the last sync.
+
+        Args:
+            guild: the guild to sync. If None, sync the global commands.
+            force: if True, sync even if the commands didn't change.
+
+        Returns:
+            The synced commands, or None if the sync was skipped.
+        """
+        scope = str(guild.id) if guild else "global"
+        tree_hash = self.command_tree_hash(guild)
+        last_sync = CommandTreeHash.get_or_none(CommandTreeHash.scope == scope)
+        if not force and last_sync and last_sync.hash == tree_hash:
+            self.logger.info(f"App commands ({scope}) unchanged, skipping sync")
+            return None
+        synced = await self.tree.sync(guild=guild)
+        last_sync = last_sync or CommandTreeHash(scope=scope)
+        last_sync.hash = tree_hash
+        last_sync.save()
+        return synced
+
+    async def _refresh_caches(self):
+        await self.wait_until_ready()
+        await self.club_service.refresh_cache()
+
+    async def close(self):
+        self.watchdog.stop()
+        if self.webhook:
+            await self.webhook.stop()
+        self.snapshot.periodic_save.cancel()
+        await self.snapshot.save()
+        if self.recorder:
+            self.recorder.close()
+        await super().close()
+
+    async def on_socket_raw_receive(self, msg: str):
+        # only dispatched when the gateway events recording is enabled
+        self.recorder.record(msg)
+
     async def on_ready(self):
         await self.wait_until_ready()
         self.watched_guild = self.get_guild(self.settings.guild.id)
+        self.scheduler.start()
         await self.change_presence(activity=Game(name="/help"))
         self.logger.info(f"Bot ready to act on {self.watched_guild.name}")
 
@@ -77,6 +173,8 @@ async def main():
         setup_logging()
         (BASE_DIR / "data").mkdir(exist_ok=True)
         (BASE_DIR / "log").mkdir(exist_ok=True)
+        # create the tables missing from the database, if any
+        models.init()
         handler = handlers.RotatingFileHandler(
             filename=BASE_DIR / "log/bot.log",
             maxBytes=10485760,  # 10Mo
@@ -89,7 +187,20 @@ async def main():
         )
         setup_logging(handler=handler, formatter=formatter)
 
-        await bot.start(bot.settings.bot.token.get_secret_value())
+        loop = asyncio.get_running_loop()
+        closing = set()
+
+        def on_sigterm():
+            # `docker stop` sends SIGTERM : close the bot properly,
+            # so that the caches are saved and the recording is finished.
+            loop.remove_signal_handler(signal.SIGTERM)
+            task = asyncio.create_task(bot.close())
+            closing.add(task)
+            task.add_done_callback(closing.discard)
+
+        loop.add_signal_handler(signal.SIGTERM, on_sigterm)
+        async with bot:
+            await bot.start(bot.settings.bot.token.get_secret_value())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+"""Replay gateway events recorded by the bot, to compare versions of the bot.
+
+The bot doesn't connect to discord : the recorded events are fed
+directly to the event parsers of discord.py, at the original speed
+or faster, and the requests to the discord API are answered
+by a local stand-in, which only counts them.
+Requests to the sith API are sent to the url of the configuration,
+which should point to a local stand-in of the sith.
+
+The replay works on temporary copies of the database and of the cache
+snapshot, and doesn't start the webhook server, the scheduler
+nor the periodic snapshot saves, so it can run next to the real bot.
+
+Recordings are made by enabling `record_gateway_events`
+in the bot section of the configuration.
+
+Usage:
+    python -m src.replay data/gateway-20261019-093000.jsonl.gz --speed 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import sqlite3
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from discord.utils import setup_logging
+from discord.webhook.async_ import async_context
+
+from src.client import SithClient
+from src.db import models
+from src.main import AeBot
+from src.services import snapshot
+from src.services.recorder import read_recording
+
+if TYPE_CHECKING:
+    from discord.http import Route
+
+
+class DiscordStandIn:
+    """Answer the requests to the discord API in place of discord.
+
+    Requests are not sent anywhere, they are only counted by route.
+    """
+
+    def __init__(self):
+        self.calls: Counter[str] = Counter()
+
+    async def request(self, route: Route, *_args: Any, **_kwargs: Any) -> None:
+        self.calls[f"{route.method} {route.path}"] += 1
+
+    async def change_presence(self, **_kwargs: Any):
+        # The presence is sent through the gateway, which isn't connected
+        pass
+
+
+def isolate(directory: Path):
+    """Make the bot use copies of the database and snapshot in this directory."""
+    db_path = directory / "db.sqlite3"
+    source = Path(models.db.database)
+    if source.exists():
+        # the backup API gives a consistent copy, even if the bot is writing
+        src, dst = sqlite3.connect(source), sqlite3.connect(db_path)
+        try:
+            src.backup(dst)
+        finally:
+            src.close()
+            dst.close()
+    models.db.init(db_path)
+    models.init()
+    snapshot_path = directory / snapshot.SNAPSHOT_PATH.name
+    if snapshot.SNAPSHOT_PATH.exists():
+        snapshot_path.write_bytes(snapshot.SNAPSHOT_PATH.read_bytes())
+    snapshot.SNAPSHOT_PATH = snapshot_path
+
+
+async def replay(path: Path, speed: float):
+    logger = logging.getLogger("replay")
+    async with SithClient() as client:
+        bot = AeBot(client, chunk_guilds_at_startup=False)
+        stand_in = DiscordStandIn()
+        bot.http.request = stand_in.request
+        # interaction responses are sent through the webhook adapter
+        async_context.get().request = stand_in.request
+        bot.change_presence = stand_in.change_presence
+        # the timers of the copied database must not fire during the replay
+        bot.scheduler.start = lambda: None
+        await bot._async_setup_hook()
+        # Only the part of setup_hook which doesn't act outside of the replay :
+        # no webhook server, no snapshot saves, no recording and no commands sync
+        bot.watchdog.start()
+        if bot.snapshot.load():
+            bot._refresh_task = asyncio.create_task(bot._refresh_caches())
+        await bot.add_cogs()
+
+        parsers = bot._connection.parsers
+        events: Counter[str] = Counter()
+        loop = asyncio.get_running_loop()
+        start = None
+        for timestamp, event, data in read_recording(path):
+            if start is None and event not in ("READY", "GUILD_CREATE"):
+                # The recorded traffic begins once the bot is ready
+                await bot.wait_until_ready()
+                start = loop.time() - timestamp / speed
+            if start is not None:
+                delay = start + timestamp / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                parsers[event](data)
+            except Exception:
+                logger.exception(f"Could not replay {event} event")
+            events[event] += 1
+        elapsed = loop.time() - start if start is not None else 0
+        # let the bot finish to handle the last events
+        await asyncio.sleep(2)
+
+        lines = [f"{sum(events.values())} events replayed in {elapsed:.3f}sec"]
+        lines.extend(f"  {count:6} {event}" for event, count in events.most_common())
+        lines.append(f"{sum(stand_in.calls.values())} requests to discord")
+        lines.extend(
+            f"  {count:6} {route}" for route, count in stand_in.calls.most_common()
+        )
+        lines.append("Event loop lag")
+        lines.extend(
+            f"  {name} : {value * 1000:.1f}ms"
+            for name, value in bot.watchdog.percentiles().items()
+        )
+        logger.info("\n".join(lines))
+        bot.watchdog.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded gateway events.")
+    parser.add_argument("recording", type=Path)
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1,
+        help="speed factor of the replay (1 means the original speed)",
+    )
+    args = parser.parse_args()
+    setup_logging()
+    with tempfile.TemporaryDirectory() as directory:
+        isolate(Path(directory))
+        try:
+            asyncio.run(replay(args.recording, args.speed))
+        finally:
+            models.db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+
+    from discord import Embed
+    from pydantic import BaseModel
+
+
+class EmbedCache:
+    """Cache of rendered embeds.
+
+    Each embed is stored alongside the schema it was rendered from.
+    When the schema given at lookup differs from the stored one,
+    the cached embed is considered stale and is not returned.
+
+    When the cache is full, the least recently used entry is evicted.
+
+    Embeds are stored and returned as is, without copying them
+    (copying an embed costs as much as rendering it again) :
+    the returned embeds are shared and must not be modified.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self._maxsize = maxsize
+        self._entries: dict[Hashable, tuple[BaseModel, Embed]] = {}
+
+    def get(self, key: Hashable, schema: BaseModel) -> Embed | None:
+        """Return the embed rendered from this schema, if any."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        cached_schema, embed = entry
+        if cached_schema is not schema and cached_schema != schema:
+            # the data changed since the embed has been rendered
+            return None
+        self._entries[key] = entry  # move the entry to the end (most recently used)
+        return embed
+
+    def set(self, key: Hashable, schema: BaseModel, embed: Embed):
+        self._entries.pop(key, None)
+        self._entries[key] = (schema, embed)
+        if len(self._entries) > self._maxsize:
+            del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
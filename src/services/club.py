@@ -1,20 +1,34 @@
 from __future__ import annotations
 
 import asyncio
-from typing import TYPE_CHECKING
+import csv
+import json
+import logging
+import time
+from typing import TYPE_CHECKING, Literal
 from urllib.parse import urljoin
 
+from aiohttp import ClientError
 from discord import CategoryChannel, Embed, PermissionOverwrite, utils
 
+from src.client import PRESIDENT_ROLE, TREASURER_ROLE
 from src.db.models import Club
+from src.services.cache import EmbedCache
 from src.settings import Settings
 
 if TYPE_CHECKING:
+    from typing import TextIO
+
     from discord import Guild, Member, Message
 
-    from src.client import ClubSchema, SimpleClubSchema
+    from src.client import ClubInfoSchema, SimpleClubSchema
     from src.main import AeBot
 
+# Number of seconds during which a cached club is considered up to date
+CLUB_CACHE_TTL = 60
+PREFETCH_CONCURRENCY = 4
+MAX_PENDING_PREFETCH = 8
+
 
 class ClubError(Exception):
     """Errors related to operations on clubs"""
@@ -34,23 +48,179 @@ class ClubService:
     def __init__(self, bot: AeBot):
         self._config = Settings()
         self._client = bot.client
-        self._club_cache = {}
+        self._logger = logging.getLogger("club")
+        # for each club, the time when it was fetched and its data
+        self._club_cache: dict[int, tuple[float, ClubInfoSchema | None]] = {}
+        # clubs restored from a snapshot, and not fetched again since then
+        self._restored: set[int] = set()
+        self._prefetch_tasks: dict[int, asyncio.Task] = {}
+        self._prefetch_semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+        self._search_cache: dict[str, list[SimpleClubSchema]] = {}
+        self._embed_cache = EmbedCache()
         self._bot = bot
         self._background_tasks = set()
 
     async def search_club(
-        self, current: str, *, only_existing: bool
+        self, current: str, *, only_existing: bool, timeout: float | None = None
     ) -> list[SimpleClubSchema]:
-        clubs = await self._client.search_clubs(current)
+        """Search clubs matching the given string.
+
+        Args:
+            current: the string to search
+            only_existing: if True, keep only clubs that exist in the guild
+            timeout:
+                if the sith API doesn't answer within this delay (in seconds),
+                the request is abandoned and the best match from
+                the previous searches is returned instead.
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                clubs = await self._client.search_clubs(current)
+        except TimeoutError:
+            clubs = self._cached_search(current)
+        else:
+            if clubs is not None:
+                self._cache_search(current, clubs)
         if clubs and only_existing:
             clubs_ids = [c[0] for c in Club.select(Club.sith_id).tuples()]
             clubs = [c for c in clubs if c.id in clubs_ids]
         return clubs if clubs is not None else []
 
-    async def get_club(self, club_id: int) -> ClubSchema | None:
-        if club_id not in self._club_cache:
-            self._club_cache[club_id] = await self._client.get_club(club_id)
-        return self._club_cache[club_id]
+    def _cache_search(self, current: str, clubs: list[SimpleClubSchema]):
+        self._search_cache.pop(current.lower(), None)
+        self._search_cache[current.lower()] = clubs
+        if len(self._search_cache) > 512:
+            del self._search_cache[next(iter(self._search_cache))]
+
+    def _cached_search(self, current: str) -> list[SimpleClubSchema] | None:
+        """Return the best approximation of a search from previous results.
+
+        The results of the longest previous search which
+        is a prefix of the current one are filtered to keep
+        only clubs whose name contains the searched string.
+        """
+        current = current.lower()
+        for i in range(len(current), 0, -1):
+            if (clubs := self._search_cache.get(current[:i])) is not None:
+                return [c for c in clubs if current in c.name.lower()]
+        return None
+
+    async def get_club(
+        self, club_id: int, *, max_age: float | None = None
+    ) -> ClubInfoSchema | None:
+        """Get the club, from the cache if possible.
+
+        Args:
+            club_id: the sith id of the club
+            max_age: if given, a cached club older than this
+                number of seconds is fetched again.
+                A club restored from a snapshot is still returned,
+                and fetched again in the background.
+        """
+        entry = self._club_cache.get(club_id)
+        if entry is not None and (
+            max_age is None or time.monotonic() - entry[0] <= max_age
+        ):
+            return entry[1]
+        if entry is not None and entry[1] is not None and club_id in self._restored:
+            self._restored.discard(club_id)
+            self.prefetch_clubs([club_id])
+            return entry[1]
+        if task := self._prefetch_tasks.get(club_id):
+            # the club is already being fetched, don't issue another request
+            club = await asyncio.shield(task)
+            if club is not None:
+                return club
+        return await self._fetch_club(club_id)
+
+    async def _fetch_club(self, club_id: int) -> ClubInfoSchema | None:
+        club = await self._client.get_club_infos(club_id)
+        self._club_cache[club_id] = (time.monotonic(), club)
+        self._restored.discard(club_id)
+        return club
+
+    def prefetch_clubs(self, club_ids: list[int]):
+        """Fetch those clubs in the background, if they aren't already cached.
+
+        This is used to speculatively fetch clubs that are likely
+        to be used soon (like the ones suggested by an autocompletion).
+        At most `PREFETCH_CONCURRENCY` clubs are fetched at the same time,
+        and new prefetches are ignored when too many are already pending.
+        """
+        now = time.monotonic()
+        for club_id in club_ids:
+            if len(self._prefetch_tasks) >= MAX_PENDING_PREFETCH:
+                return
+            entry = self._club_cache.get(club_id)
+            if club_id in self._prefetch_tasks or (
+                entry is not None and now - entry[0] <= CLUB_CACHE_TTL
+            ):
+                continue
+            task = asyncio.create_task(self._prefetch_club(club_id))
+            self._prefetch_tasks[club_id] = task
+            task.add_done_callback(
+                lambda _, club_id=club_id: self._prefetch_tasks.pop(club_id, None)
+            )
+
+    async def _prefetch_club(self, club_id: int) -> ClubInfoSchema | None:
+        async with self._prefetch_semaphore:
+            try:
+                return await self._fetch_club(club_id)
+            except (ClientError, TimeoutError) as e:
+                self._logger.warning(f"Could not prefetch club {club_id} : {e!r}")
+                return None
+
+    def invalidate_club(self, club_id: int):
+        """Remove everything cached about this club."""
+        self._club_cache.pop(club_id, None)
+        self._restored.discard(club_id)
+        self._embed_cache.invalidate(club_id)
+        # the name of the club may have changed
+        self._search_cache.clear()
+
+    def export_cache(
+        self,
+    ) -> tuple[list[ClubInfoSchema], dict[str, list[SimpleClubSchema]]]:
+        """Return the cached clubs and search results."""
+        clubs = [c for _, c in self._club_cache.values() if c is not None]
+        return clubs, dict(self._search_cache)
+
+    def restore_cache(
+        self,
+        clubs: list[ClubInfoSchema],
+        searches: dict[str, list[SimpleClubSchema]],
+        *,
+        age: float,
+    ):
+        """Fill the caches with previously exported data.
+
+        Entries already in the cache are kept, as they are more recent.
+
+        Args:
+            clubs: the exported clubs
+            searches: the exported search results
+            age: the number of seconds since the data was exported
+        """
+        fetched_at = time.monotonic() - age
+        for club in clubs:
+            if club.id not in self._club_cache:
+                self._club_cache[club.id] = (fetched_at, club)
+                self._restored.add(club.id)
+        for search, results in searches.items():
+            self._search_cache.setdefault(search, results)
+
+    async def refresh_cache(self):
+        """Fetch again the outdated clubs of the cache from the sith."""
+        now = time.monotonic()
+        club_ids = [
+            club_id
+            for club_id, (fetched_at, _) in self._club_cache.items()
+            if now - fetched_at > CLUB_CACHE_TTL
+        ]
+        async for club_id, club in self._client.get_clubs(club_ids):
+            if club is not None:
+                self._club_cache[club_id] = (time.monotonic(), club)
+                self._restored.discard(club_id)
 
     async def get_channel(self, guild: Guild, category_id: int, name: str):
         category = utils.get(guild.categories, id=category_id)
@@ -61,12 +231,18 @@ class ClubService:
             if channel_name == name:
                 return channel
 
-    def embed(self, club: ClubSchema) -> Embed:
-        """Return an discord embed with infos about this club."""
+    def embed(self, club: ClubInfoSchema) -> Embed:
+        """Return an discord embed with infos about this club.
+
+        The embed may be shared with other callers, it must not be modified.
+        """
+        if (cached := self._embed_cache.get(club.id, club)) is not None:
+            return cached
         embed = Embed(title=club.name, description=club.short_description)
-        for role_id, role_name in [(10, "Président(e)"), (7, "Trésorier(e)")]:
+        roles = [(PRESIDENT_ROLE, "Président(e)"), (TREASURER_ROLE, "Trésorier(e)")]
+        for role_id, role_name in roles:
             user = next(
-                (member.user for member in club.members if member.role == role_id), None
+                (member.user for member in club.board if member.role == role_id), None
             )
             if user:
                 username = f"{user.first_name} {user.last_name}"
@@ -77,9 +253,10 @@ class ClubService:
             embed = embed.set_thumbnail(
                 url=urljoin(str(self._client._base_url), club.logo)
             )
+        self._embed_cache.set(club.id, club, embed)
         return embed
 
-    async def create_club(self, club: ClubSchema, guild: Guild, mess: Message):
+    async def create_club(self, club: ClubInfoSchema, guild: Guild, mess: Message):
         if Club.filter(Club.sith_id == club.id).exists():
             raise ClubExists
         # create the role for member, presidence and treasurer
@@ -187,7 +364,7 @@ class ClubService:
                 )
 
     async def handover(
-        self, club: ClubSchema, new_pres: Member, new_treso: Member, guild: Guild
+        self, club: ClubInfoSchema, new_pres: Member, new_treso: Member, guild: Guild
     ):
         club = Club.get_or_none(Club.sith_id == club.id)
 
@@ -230,6 +407,47 @@ class ClubService:
         self._background_tasks.add(task)
         task.add_done_callback(self._background_tasks.discard)
 
+    async def export_memberships(
+        self, guild: Guild, out: TextIO, *, fmt: Literal["csv", "json"] = "csv"
+    ):
+        """Write which guild member holds which club role in `out`.
+
+        The guild members are iterated only once, and each row is written
+        as soon as it is found, so the export doesn't build the whole dataset
+        in memory.
+        The event loop is regularly given back, so that the bot
+        stays responsive during the export of a large guild.
+        """
+        club_roles: dict[int, tuple[Club, str]] = {}
+        for club in Club.select():
+            club_roles[club.president_role_id] = (club, "Responsable")
+            club_roles[club.treasurer_role_id] = (club, "Trésorier")
+            club_roles[club.member_role_id] = (club, "Membre")
+            club_roles[club.former_member_role_id] = (club, "Ancien membre")
+        fields = ["club", "club_sith_id", "role", "member_id", "member_name"]
+        if fmt == "csv":
+            writer = csv.writer(out)
+            writer.writerow(fields)
+        else:
+            out.write("[")
+        nb_rows = 0
+        for i, member in enumerate(guild.members):
+            if i % 500 == 0:
+                await asyncio.sleep(0)
+            for role in member.roles:
+                if role.id not in club_roles:
+                    continue
+                club, role_name = club_roles[role.id]
+                row = [club.name, club.sith_id, role_name, member.id, member.name]
+                if fmt == "csv":
+                    writer.writerow(row)
+                else:
+                    out.write(",\n" if nb_rows else "\n")
+                    out.write(json.dumps(dict(zip(fields, row, strict=True))))
+                nb_rows += 1
+        if fmt == "json":
+            out.write("\n]\n")
+
     @staticmethod
     async def move_to_bottom(category: CategoryChannel):
         """Move this category after the last category belong to an active club.
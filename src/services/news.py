@@ -6,15 +6,64 @@ from urllib.parse import urljoin
 
 from discord import Colour, Embed
 
+from src.services.cache import EmbedCache
+
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
     from src.client import NewsDateSchema, NewsSchema
     from src.main import AeBot
 
+# Limits of discord messages and embeds
+# (see https://discord.com/developers/docs/resources/message#embed-object-embed-limits)
+EMBED_TITLE_LIMIT = 256
+EMBED_DESCRIPTION_LIMIT = 4096
+MESSAGE_EMBEDS_LIMIT = 10
+MESSAGE_EMBEDS_CHARS_LIMIT = 6000
+
+
+def truncate(text: str, length: int) -> str:
+    """Shorten the text to at most `length` characters, without cutting words."""
+    if len(text) <= length:
+        return text
+    cut = text[: length - 1]
+    if not text[length - 1].isspace():
+        # don't keep the beginning of a word that has been cut
+        head, sep, _ = cut.rpartition(" ")
+        if sep:
+            cut = head
+    return cut.rstrip() + "…"
+
+
+def pack_embeds(embeds: Iterable[Embed]) -> list[list[Embed]]:
+    """Split the embeds into the fewest messages allowed by discord.
+
+    A message can hold at most 10 embeds and 6000 characters
+    over all its embeds.
+    The order of the embeds is kept.
+    """
+    messages: list[list[Embed]] = []
+    current: list[Embed] = []
+    current_length = 0
+    for embed in embeds:
+        if current and (
+            len(current) == MESSAGE_EMBEDS_LIMIT
+            or current_length + len(embed) > MESSAGE_EMBEDS_CHARS_LIMIT
+        ):
+            messages.append(current)
+            current, current_length = [], 0
+        current.append(embed)
+        current_length += len(embed)
+    if current:
+        messages.append(current)
+    return messages
+
 
 class NewsService:
     def __init__(self, bot: AeBot):
         self._client = bot.client
         self._bot = bot
+        self._embed_cache = EmbedCache()
 
     async def get_upcoming_news(self, *, nb_days: int = 3) -> list[NewsDateSchema]:
         """Fetch news of the next following days from the sith."""
@@ -24,18 +73,25 @@ class NewsService:
         return news or []
 
     def embed(self, news: NewsSchema) -> Embed:
-        """Return a discord embed with infos about this news date."""
+        """Return a discord embed with infos about this news date.
+
+        The embed may be shared with other callers, it must not be modified.
+        """
+        if (cached := self._embed_cache.get(news.id, news)) is not None:
+            return cached
         embed = Embed(
-            title=news.title,
-            description=news.summary,
+            title=truncate(news.title, EMBED_TITLE_LIMIT),
+            description=truncate(news.summary, EMBED_DESCRIPTION_LIMIT),
             url=urljoin(str(self._client._base_url), news.club.logo),
             colour=Colour.blue(),
         )
         embed.set_author(
-            name=news.club.name, url=urljoin(str(self._client._base_url), news.club.url)
+            name=truncate(news.club.name, EMBED_TITLE_LIMIT),
+            url=urljoin(str(self._client._base_url), news.club.url),
         )
         if news.club.logo:
             embed = embed.set_thumbnail(
                 url=urljoin(str(self._client._base_url), news.club.logo)
             )
+        self._embed_cache.set(news.id, news, embed)
         return embed
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from types import FrameType
+
+
+class SamplingProfiler:
+    """Statistical profiler of the event loop thread.
+
+    A helper thread periodically captures the stack of the event loop thread.
+    The overhead on the profiled code is very low,
+    so it can be used on the running bot, with its real traffic.
+
+    Examples:
+        ```python
+        profiler = SamplingProfiler()
+        await profiler.run(30)
+        print(profiler.report())
+        ```
+    """
+
+    def __init__(self, *, interval: float = 0.005):
+        self._interval = interval
+        self._stacks: Counter[tuple[str, ...]] = Counter()
+
+    async def run(self, duration: float):
+        """Sample the stack of the current thread for `duration` seconds."""
+        thread_id = threading.get_ident()
+        await asyncio.to_thread(self._sample, thread_id, duration)
+
+    def _sample(self, thread_id: int, duration: float):
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self._stacks[self._stack(frame)] += 1
+            time.sleep(self._interval)
+
+    @staticmethod
+    def _stack(frame: FrameType | None) -> tuple[str, ...]:
+        """Return the names of the functions in the stack, outermost first."""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            filename = Path(code.co_filename).name
+            stack.append(f"{code.co_qualname} ({filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def report(self, limit: int = 40) -> str:
+        """Return the functions where the most time has been spent.
+
+        For each function, the `own` column is the proportion of samples
+        in which the function itself was running,
+        and the `total` column the proportion of samples
+        in which the function was in the stack.
+        """
+        nb_samples = sum(self._stacks.values())
+        if not nb_samples:
+            return "No sample"
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, count in self._stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        lines = [f"{nb_samples} samples", "", "  own%  total%  function"]
+        lines.extend(
+            f"{own[f] / nb_samples:6.1%} {total[f] / nb_samples:7.1%}  {f}"
+            for f, _ in own.most_common(limit)
+        )
+        return "\n".join(lines)
+
+    def collapsed_stacks(self) -> str:
+        """Return the samples in the collapsed stack format.
+
+        This format can be read by most flamegraph tools
+        (flamegraph.pl, speedscope, inferno...).
+        """
+        return "\n".join(
+            f"{';'.join(stack)} {count}" for stack, count in self._stacks.items()
+        )
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import secrets
+import time
+import zlib
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+RECORDED_EVENTS = {
+    "READY",
+    "GUILD_CREATE",
+    "MESSAGE_REACTION_ADD",
+    "MESSAGE_REACTION_REMOVE",
+    "INTERACTION_CREATE",
+    "GUILD_MEMBER_ADD",
+    "GUILD_MEMBER_UPDATE",
+    "GUILD_MEMBER_REMOVE",
+    "GUILD_ROLE_CREATE",
+    "GUILD_ROLE_UPDATE",
+    "GUILD_ROLE_DELETE",
+}
+# keys whose value is the name of a user
+NAME_KEYS = {"username", "global_name", "nick"}
+# keys whose value is personal or secret and useless for a replay
+DROPPED_KEYS = {
+    "avatar",
+    "avatar_decoration_data",
+    "banner",
+    "email",
+    "session_id",
+    "resume_gateway_url",
+}
+# keys whose value is an object (or a list of objects) describing a user
+USER_KEYS = {"user", "author", "mentions", "recipients"}
+# keys whose value is the id of a user
+USER_ID_KEYS = {"user_id", "owner_id", "message_author_id"}
+# type of the user context menu commands, whose target is a user
+USER_COMMAND_TYPE = 2
+# mentions of users in the content of messages
+USER_MENTION = re.compile(r"<@!?(\d+)>")
+# The recording is written by blocks, each one being a complete gzip member,
+# so that it stays readable if the bot is killed.
+# A block is written every FLUSH_EVERY events, or as soon as
+# an event comes FLUSH_INTERVAL seconds after the previous block.
+FLUSH_EVERY = 100
+FLUSH_INTERVAL = 10
+# types of the slash command options whose value may be the id of a user
+# (USER and MENTIONABLE options)
+USER_OPTION_TYPES = {6, 9}
+
+
+class GatewayRecorder:
+    """Record gateway events received by the bot in a compact log file.
+
+    The file is a gzipped JSON Lines file, in which each line is like
+    `{"t": 1.234, "e": "MESSAGE_REACTION_ADD", "d": {...}}`,
+    where `t` is the number of seconds since the beginning of the recording.
+
+    The events are anonymized : user ids are replaced by pseudonyms
+    (the same user always gets the same pseudonym in a recording),
+    usernames by hashes, and avatars, tokens and session data are removed.
+    Guild, channel and role ids are kept,
+    so that the recording can be replayed with the same configuration.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._file = None
+        self._buffer: list[str] = []
+        self._start = time.monotonic()
+        self._last_flush = self._start
+        # a random salt makes the pseudonyms impossible
+        # to match with the real ids, even by brute force
+        self._salt = secrets.token_bytes(16)
+
+    def start(self):
+        self._start = time.monotonic()
+        self._last_flush = self._start
+        self._file = self._path.open("ab")
+
+    def flush(self):
+        """Write the buffered events in the file, as a new gzip member."""
+        self._last_flush = time.monotonic()
+        if self._file is None or not self._buffer:
+            return
+        self._file.write(gzip.compress("".join(self._buffer).encode()))
+        self._file.flush()
+        self._buffer.clear()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def record(self, raw_message: str):
+        """Record this raw gateway message, if it's an interesting event."""
+        if self._file is None:
+            return
+        message = json.loads(raw_message)
+        if message.get("t") not in RECORDED_EVENTS:
+            return
+        line = {
+            "t": round(time.monotonic() - self._start, 4),
+            "e": message["t"],
+            "d": self._anonymize(message["d"]),
+        }
+        self._buffer.append(json.dumps(line, separators=(",", ":")) + "\n")
+        if (
+            len(self._buffer) >= FLUSH_EVERY
+            or time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def _pseudonym(self, value: str) -> str:
+        digest = hashlib.sha256(self._salt + value.encode()).hexdigest()
+        return str(int(digest[:15], 16))  # looks like a discord snowflake
+
+    def _anonymize(self, value: Any, parent_key: str | None = None) -> Any:
+        if isinstance(value, list):
+            return [self._anonymize(v, parent_key) for v in value]
+        if not isinstance(value, dict):
+            return value
+        result = {}
+        for key, val in value.items():
+            if key in DROPPED_KEYS:
+                result[key] = None
+            elif key == "token":
+                result[key] = "redacted"
+            elif key in NAME_KEYS and isinstance(val, str):
+                result[key] = f"user-{self._pseudonym(val)[:8]}"
+            elif key in USER_ID_KEYS or (key == "id" and parent_key in USER_KEYS):
+                result[key] = self._pseudonym(str(val))
+            elif key == "value" and value.get("type") in USER_OPTION_TYPES:
+                # pseudonymized like the user it designates,
+                # so that it still matches the resolved users of the interaction
+                result[key] = self._pseudonym(str(val))
+            elif key == "target_id" and value.get("type") == USER_COMMAND_TYPE:
+                result[key] = self._pseudonym(str(val))
+            elif key == "authorizing_integration_owners" and isinstance(val, dict):
+                # "0" is the id of a guild, "1" the id of a user
+                result[key] = {
+                    k: self._pseudonym(str(v)) if k == "1" else v
+                    for k, v in val.items()
+                }
+            elif key == "content" and isinstance(val, str):
+                result[key] = USER_MENTION.sub(
+                    lambda m: f"<@{self._pseudonym(m[1])}>", val
+                )
+            elif key in ("users", "members") and isinstance(val, dict):
+                # resolved users and members of an interaction, indexed by user id
+                item_key = "user" if key == "users" else None
+                result[key] = {
+                    self._pseudonym(k): self._anonymize(v, item_key)
+                    for k, v in val.items()
+                }
+            else:
+                result[key] = self._anonymize(val, key)
+        return result
+
+
+def read_recording(path: Path) -> Iterator[tuple[float, str, dict[str, Any]]]:
+    """Yield the (time, event name, data) of the events of a recording.
+
+    If the end of the recording is truncated (because the bot
+    was killed while writing it), the events before are still yielded.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                event = json.loads(line)
+                yield event["t"], event["e"], event["d"]
+        except (EOFError, zlib.error, gzip.BadGzipFile, json.JSONDecodeError) as e:
+            logging.getLogger("recorder").warning(
+                f"The recording is truncated, ignoring its end : {e!r}"
+            )
+
+
+def recording_path(directory: Path) -> Path:
+    now = datetime.now(tz=UTC).strftime("%Y%m%d-%H%M%S")
+    return directory / f"gateway-{now}.jsonl.gz"
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import json
+import logging
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any
+
+from src.db.models import Timer
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+type TimerHandler = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class Scheduler:
+    """Run jobs at a given time.
+
+    Pending timers are kept in a heap ordered by due date,
+    and a single background task sleeps until the earliest one,
+    so thousands of timers don't need thousands of tasks.
+
+    Timers are stored in the database, so they survive restarts.
+    Timers which became due while the bot was offline
+    are run as soon as the scheduler starts.
+
+    Examples:
+        ```python
+        async def remind(payload: dict):
+            ...
+
+        scheduler.register("reminder", remind)
+        scheduler.schedule("reminder:42", "reminder", when, {"id": 42})
+        ```
+    """
+
+    def __init__(self):
+        self._logger = logging.getLogger("scheduler")
+        self._handlers: dict[str, TimerHandler] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        # The due date of each pending timer.
+        # Heap entries which don't match it are outdated and ignored.
+        self._due: dict[str, float] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._background_tasks = set()
+
+    def register(self, kind: str, handler: TimerHandler):
+        """Set the coroutine to call when a timer of this kind is due."""
+        self._handlers[kind] = handler
+
+    def is_scheduled(self, key: str) -> bool:
+        # Timers may be stored in the database but not loaded yet
+        return key in self._due or Timer.filter(Timer.key == key).exists()
+
+    def schedule(
+        self, key: str, kind: str, when: datetime, payload: dict[str, Any] | None = None
+    ):
+        """Schedule a timer.
+
+        Args:
+            key: unique identifier of the timer.
+                If a timer with the same key exists, it is replaced.
+            kind: the kind of timer, used to find its handler
+            when: the moment when the handler should be called
+            payload: JSON-serializable data given to the handler
+        """
+        timer = Timer.get_or_none(Timer.key == key) or Timer(key=key)
+        timer.kind = kind
+        timer.due_at = when.timestamp()
+        timer.payload = json.dumps(payload or {})
+        timer.save()
+        self._push(key, timer.due_at)
+
+    def cancel(self, key: str):
+        Timer.delete().where(Timer.key == key).execute()
+        self._due.pop(key, None)
+
+    def start(self):
+        """Load the stored timers and start waiting for them.
+
+        Calling this method when the scheduler already runs does nothing.
+        """
+        if self._task is not None:
+            return
+        for key, due_at in Timer.select(Timer.key, Timer.due_at).tuples():
+            self._push(key, due_at)
+        self._task = asyncio.create_task(self._run())
+
+    def _push(self, key: str, timestamp: float):
+        self._due[key] = timestamp
+        heapq.heappush(self._heap, (timestamp, next(self._counter), key))
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = datetime.now(tz=UTC).timestamp()
+            while self._heap and self._heap[0][0] <= now:
+                timestamp, _, key = heapq.heappop(self._heap)
+                if self._due.get(key) == timestamp:
+                    self._fire(key)
+            delay = self._heap[0][0] - now if self._heap else None
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+
+    def _fire(self, key: str):
+        del self._due[key]
+        timer = Timer.get_or_none(Timer.key == key)
+        if timer is None:
+            return
+        timer.delete_instance()
+        handler = self._handlers.get(timer.kind)
+        if handler is None:
+            self._logger.warning(f"No handler for timer {key} of kind {timer.kind}")
+            return
+        # see https://docs.python.org/3/library/asyncio-task.html#creating-tasks
+        task = asyncio.create_task(self._call(handler, key, json.loads(timer.payload)))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _call(self, handler: TimerHandler, key: str, payload: dict[str, Any]):
+        try:
+            await handler(payload)
+        except Exception:
+            self._logger.exception(f"Error while running timer {key}")
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import zlib
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING, Literal
+
+from discord.ext import tasks
+from pydantic import BaseModel, ValidationError
+
+from src.client import ClubInfoSchema, SimpleClubSchema  # noqa TC001
+from src.settings import BASE_DIR
+
+if TYPE_CHECKING:
+    from src.main import AeBot
+
+SNAPSHOT_PATH = BASE_DIR / "data" / "cache_snapshot.json.gz"
+# Older snapshots are too likely to be outdated to be worth loading
+SNAPSHOT_MAX_AGE = timedelta(days=7)
+
+
+class CacheSnapshot(BaseModel):
+    version: Literal[1] = 1
+    created_at: datetime
+    clubs: list[ClubInfoSchema]
+    searches: dict[str, list[SimpleClubSchema]]
+
+
+class SnapshotService:
+    """Save the caches of the bot on disk, to restore them after a restart.
+
+    Without it, every restart starts with empty caches,
+    which makes the first minutes after a deploy slow
+    and hammers the sith API.
+    """
+
+    def __init__(self, bot: AeBot):
+        self._bot = bot
+        self._logger = logging.getLogger("snapshot")
+
+    def dump(self) -> bytes:
+        clubs, searches = self._bot.club_service.export_cache()
+        snapshot = CacheSnapshot(
+            created_at=datetime.now(tz=UTC), clubs=clubs, searches=searches
+        )
+        return gzip.compress(snapshot.model_dump_json().encode())
+
+    async def save(self):
+        data = self.dump()
+        await asyncio.to_thread(self._write, data)
+
+    @staticmethod
+    def _write(data: bytes):
+        # write to a temporary file first, so that a crash
+        # in the middle of the write doesn't corrupt the snapshot
+        tmp_path = SNAPSHOT_PATH.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(SNAPSHOT_PATH)
+
+    def load(self) -> bool:
+        """Restore the caches from the snapshot on disk.
+
+        Returns:
+            True if the snapshot was valid and has been loaded, else False.
+        """
+        if not SNAPSHOT_PATH.exists():
+            return False
+        try:
+            content = gzip.decompress(SNAPSHOT_PATH.read_bytes())
+            snapshot = CacheSnapshot.model_validate_json(content)
+        except (OSError, EOFError, zlib.error, ValidationError) as e:
+            self._logger.warning(f"Invalid cache snapshot, ignoring it : {e}")
+            return False
+        age = datetime.now(tz=UTC) - snapshot.created_at
+        if age > SNAPSHOT_MAX_AGE:
+            self._logger.info("Cache snapshot is too old, ignoring it")
+            return False
+        self._bot.club_service.restore_cache(
+            snapshot.clubs, snapshot.searches, age=max(age.total_seconds(), 0)
+        )
+        self._logger.info(
+            f"Cache snapshot loaded ({len(snapshot.clubs)} clubs, "
+            f"{len(snapshot.searches)} searches)"
+        )
+        return True
+
+    @tasks.loop(minutes=30)
+    async def periodic_save(self):
+        await self.save()
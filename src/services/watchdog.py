@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import statistics
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+
+class LoopWatchdog:
+    """Measure the lag of the event loop and find what blocks it.
+
+    A task sleeps for a fixed interval and measures how late it wakes up.
+    Meanwhile, a helper thread checks that this task keeps waking up.
+    When it doesn't, the event loop is blocked by synchronous code,
+    so the helper thread captures the stack of the event loop thread
+    and logs it.
+
+    Args:
+        interval: the delay between two measures, in seconds
+        threshold: the lag (in seconds) above which the loop is considered blocked
+    """
+
+    def __init__(self, *, interval: float = 0.5, threshold: float = 0.25):
+        self._logger = logging.getLogger("watchdog")
+        self._interval = interval
+        self._threshold = threshold
+        self._lags: deque[float] = deque(maxlen=1200)
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._stop = threading.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        """Start the watchdog. Must be called from the event loop thread."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    def percentiles(self) -> dict[str, float]:
+        """Return the median, 95th and 99th percentiles and max of the recent lags."""
+        if len(self._lags) < 2:
+            return {}
+        quantiles = statistics.quantiles(self._lags, n=100, method="inclusive")
+        return {
+            "p50": quantiles[49],
+            "p95": quantiles[94],
+            "p99": quantiles[98],
+            "max": max(self._lags),
+        }
+
+    async def _heartbeat(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self._interval)
+            self._last_beat = time.monotonic()
+            lag = max(self._last_beat - start - self._interval, 0)
+            self._lags.append(lag)
+            if lag > self._threshold:
+                self._logger.warning(f"Event loop lagged for {lag:.3f}sec")
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self._threshold / 2):
+            last_beat = self._last_beat
+            blocked_for = time.monotonic() - last_beat - self._interval
+            if blocked_for < self._threshold or last_beat == reported_beat:
+                continue
+            # report each blocking only once
+            reported_beat = last_beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame, limit=15))
+            self._logger.warning(
+                f"Event loop blocked for more than {blocked_for:.3f}sec in :\n{stack}"
+            )
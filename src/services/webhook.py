@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import logging
+import time
+from typing import TYPE_CHECKING, Literal
+
+from aiohttp import web
+from pydantic import BaseModel, ValidationError
+
+if TYPE_CHECKING:
+    from src.main import AeBot
+    from src.settings import WebhookConfig
+
+# Notifications older than that are refused, to prevent replays
+MAX_NOTIFICATION_AGE = 300
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    """Return the signature of a notification, as sent by the sith."""
+    return hmac.new(
+        secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256
+    ).hexdigest()
+
+
+class ChangeNotification(BaseModel):
+    resource: Literal["club", "news"]
+    id: int
+
+
+class WebhookServer:
+    """HTTP endpoint receiving change notifications from the sith.
+
+    The sith sends a POST request on `/webhook` when a club or a news changes,
+    with a JSON body like `{"resource": "club", "id": 1}`.
+    The request must have the following headers :
+
+    - `X-Sith-Timestamp`: the UNIX timestamp of the notification
+    - `X-Sith-Signature`: the hex HMAC-SHA256 of `{timestamp}.{body}`,
+      with the secret shared by the sith and the bot
+
+    Each valid notification dispatches a `sith_club_update`
+    or a `sith_news_update` event with the id of the changed object,
+    which cogs can listen to.
+    """
+
+    def __init__(self, bot: AeBot, config: WebhookConfig):
+        self._bot = bot
+        self._config = config
+        self._logger = logging.getLogger("webhook")
+        self._runner: web.AppRunner | None = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/webhook", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self._config.host, self._config.port)
+        await site.start()
+        self._logger.info(
+            f"Listening for sith notifications on "
+            f"{self._config.host}:{self._config.port}"
+        )
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def is_signed(self, body: bytes, timestamp: str, signature: str) -> bool:
+        try:
+            age = time.time() - int(timestamp)
+        except ValueError:
+            return False
+        if abs(age) > MAX_NOTIFICATION_AGE:
+            return False
+        expected = sign(self._config.secret.get_secret_value(), timestamp, body)
+        return hmac.compare_digest(expected.encode(), signature.encode())
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        timestamp = request.headers.get("X-Sith-Timestamp", "")
+        signature = request.headers.get("X-Sith-Signature", "")
+        if not self.is_signed(body, timestamp, signature):
+            return web.Response(status=401)
+        try:
+            notification = ChangeNotification.model_validate_json(body)
+        except ValidationError as e:
+            return web.Response(status=400, text=str(e))
+        self._logger.info(f"{notification.resource} {notification.id} changed")
+        self._bot.dispatch(f"sith_{notification.resource}_update", notification.id)
+        return web.Response(status=204)
@@ -15,6 +15,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 class ApiConfig(BaseModel):
     url: HttpUrl = "http://127.0.0.1:8000/"
     api_key: SecretStr
+    keepalive_timeout: float = 30.0  # seconds an idle connection is kept open
+    dns_cache_ttl: int = 300  # seconds the resolved address is cached
 
 
 class GuildConfig(BaseModel):
@@ -30,6 +32,15 @@ class BotConfig(BaseModel):
         "INFO"
     )
     command_prefix: str = "/"
+    sync_commands_on_startup: bool = False
+    loop_lag_threshold: float = 0.25  # seconds of event loop lag before warning
+    record_gateway_events: bool = False
+
+
+class WebhookConfig(BaseModel):
+    host: str = "127.0.0.1"
+    port: int = 8080
+    secret: SecretStr
 
 
 class Settings(BaseSettings):
@@ -42,6 +53,7 @@ class Settings(BaseSettings):
     bot: BotConfig
     guild: GuildConfig
     sith_api: ApiConfig
+    webhook: WebhookConfig | None = None
 
     @classmethod
     def settings_customise_sources(
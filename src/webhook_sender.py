@@ -0,0 +1,136 @@
+"""Send change notifications to the webhook of the bot, in place of the sith.
+
+With a notification given, it is sent to the webhook
+configured in the `webhook` section of the configuration :
+
+    python -m src.webhook_sender news 12
+
+With `--check`, a webhook server is started locally
+with a stand-in of the bot, and the answers of the server
+to valid and invalid notifications are checked :
+
+    python -m src.webhook_sender --check
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import socket
+import sys
+import time
+
+from aiohttp import ClientSession
+from discord.utils import setup_logging
+
+from src.services.webhook import MAX_NOTIFICATION_AGE, WebhookServer, sign
+from src.settings import Settings, WebhookConfig
+
+
+async def send(
+    session: ClientSession,
+    config: WebhookConfig,
+    body: bytes,
+    *,
+    timestamp: str | None = None,
+    signature: str | None = None,
+) -> int:
+    """Send a notification and return the HTTP status of the answer."""
+    timestamp = timestamp or str(int(time.time()))
+    if signature is None:
+        signature = sign(config.secret.get_secret_value(), timestamp, body)
+    async with session.post(
+        f"http://{config.host}:{config.port}/webhook",
+        data=body,
+        headers={"X-Sith-Timestamp": timestamp, "X-Sith-Signature": signature},
+    ) as response:
+        return response.status
+
+
+class BotStandIn:
+    """Collect the events dispatched by the webhook server."""
+
+    def __init__(self):
+        self.events: list[tuple[str, tuple]] = []
+
+    def dispatch(self, event: str, *args):
+        self.events.append((event, args))
+
+
+async def check() -> bool:
+    logger = logging.getLogger("webhook_sender")
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    config = WebhookConfig(host="127.0.0.1", port=port, secret="stand-in secret")
+    bot = BotStandIn()
+    server = WebhookServer(bot, config)
+    await server.start()
+    body = json.dumps({"resource": "news", "id": 12}).encode()
+    stale = str(int(time.time()) - MAX_NOTIFICATION_AGE - 60)
+    cases = [
+        ("valid notification", {}, body, 204),
+        ("wrong signature", {"signature": "0" * 64}, body, 401),
+        ("non ASCII signature", {"signature": "é" * 64}, body, 401),
+        ("missing timestamp", {"timestamp": "", "signature": ""}, body, 401),
+        (
+            "stale timestamp",
+            {
+                "timestamp": stale,
+                "signature": sign(config.secret.get_secret_value(), stale, body),
+            },
+            body,
+            401,
+        ),
+        ("invalid body", {}, b'{"resource": "user", "id": 1}', 400),
+    ]
+    ok = True
+    try:
+        async with ClientSession() as session:
+            for name, headers, case_body, expected in cases:
+                status = await send(session, config, case_body, **headers)
+                if status != expected:
+                    ok = False
+                    logger.error(f"{name} : got {status} instead of {expected}")
+                else:
+                    logger.info(f"{name} : {status}")
+    finally:
+        await server.stop()
+    if bot.events != [("sith_news_update", (12,))]:
+        ok = False
+        logger.error(f"Unexpected dispatched events : {bot.events}")
+    return ok
+
+
+async def notify(resource: str, object_id: int) -> int:
+    config = Settings().webhook
+    if config is None:
+        raise SystemExit("No webhook section in the configuration")
+    body = json.dumps({"resource": resource, "id": object_id}).encode()
+    async with ClientSession() as session:
+        return await send(session, config, body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send sith change notifications.")
+    parser.add_argument("resource", nargs="?", choices=["club", "news"])
+    parser.add_argument("id", nargs="?", type=int)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="check the webhook server against a stand-in of the bot",
+    )
+    args = parser.parse_args()
+    setup_logging()
+    if args.check:
+        sys.exit(0 if asyncio.run(check()) else 1)
+    if args.resource is None or args.id is None:
+        parser.error("a resource and an id are required, unless --check is given")
+    status = asyncio.run(notify(args.resource, args.id))
+    logging.getLogger("webhook_sender").info(f"Answered with status {status}")
+
+
+if __name__ == "__main__":
+    main()